@@ -3,254 +3,242 @@
 Script to generate CloudFormation template with embedded Lambda function code
 """
 
+import argparse
+import functools
 import json
 import yaml
-from src.lambda_function import *
 
+try:
+    # libyaml bindings are an order of magnitude faster than the pure-Python dumper
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
+
+class LiteralStr(str):
+    """String rendered as a YAML literal block scalar (``|``)"""
+
+def represent_literal_str(dumper, data):
+    """Emit LiteralStr values with the literal block style"""
+    return dumper.represent_scalar('tag:yaml.org,2002:str', str(data), style='|')
+
+yaml.add_representer(LiteralStr, represent_literal_str, Dumper=SafeDumper)
+
+@functools.lru_cache(maxsize=None)
+def read_lambda_source():
+    """Read the Lambda source once; the file is static for the lifetime of a run"""
+    with open('src/lambda_function.py', 'r') as f:
+        return f.read()
+
+@functools.lru_cache(maxsize=None)
 def generate_embedded_lambda_code_for_yaml():
     """Generate Lambda code formatted for YAML using literal block scalar"""
-    with open('src/lambda_function.py', 'r') as f:
-        lines = f.readlines()
-    
-    # Process lines to ensure proper YAML formatting
-    # Remove trailing whitespace but preserve indentation
-    processed_lines = []
-    for line in lines:
-        # Remove trailing whitespace but preserve the line ending
-        processed_line = line.rstrip() + '\n' if line.strip() else '\n'
-        processed_lines.append(processed_line)
-    
-    # Join all lines and remove the final newline to avoid extra blank line
-    return ''.join(processed_lines).rstrip('\n')
+    # Strip trailing whitespace from every line (whitespace-only lines become empty)
+    # and keep a single trailing newline so the block scalar uses plain "|" chomping
+    code = '\n'.join(line.rstrip() for line in read_lambda_source().splitlines())
+    return LiteralStr(code.rstrip('\n') + '\n')
 
 def generate_embedded_lambda_code_for_json():
     """Generate Lambda code formatted for JSON as properly escaped string"""
-    with open('src/lambda_function.py', 'r') as f:
-        lambda_code = f.read()
-    
-    return lambda_code
+    return read_lambda_source()
 
-def generate_cloudformation_template_json():
-    """Generate CloudFormation template for JSON format"""
+# Static template structure; only the embedded Lambda code varies between outputs
+_TEMPLATE_BASE = {
+    "AWSTemplateFormatVersion": "2010-09-09",
+    "Description": "S3 Block Public Access Custom Resource - Enables full BPA protection at AWS account level with optional SNS notifications",
     
-    template = {
-        "AWSTemplateFormatVersion": "2010-09-09",
-        "Description": "S3 Block Public Access Custom Resource - Enables full BPA protection at AWS account level with optional SNS notifications",
-        
-        "Parameters": {
-            "NotificationTopicArn": {
-                "Type": "String",
-                "Default": "",
-                "Description": "Optional SNS Topic ARN for notifications (leave empty to disable notifications)"
-            }
+    "Parameters": {
+        "NotificationTopicArn": {
+            "Type": "String",
+            "Default": "",
+            "Description": "Optional SNS Topic ARN for notifications (leave empty to disable notifications)"
         },
-        
-        "Conditions": {
-            "HasNotificationTopic": {
-                "Fn::Not": [
+        "SuppressNoOpNotifications": {
+            "Type": "String",
+            "Default": "false",
+            "AllowedValues": ["true", "false"],
+            "Description": "Skip the SNS notification when BPA is already fully enabled and nothing changes"
+        }
+    },
+    
+    "Conditions": {
+        "HasNotificationTopic": {
+            "Fn::Not": [
+                {
+                    "Fn::Equals": [
+                        {"Ref": "NotificationTopicArn"},
+                        ""
+                    ]
+                }
+            ]
+        }
+    },
+    
+    "Resources": {
+        "S3BPALambdaRole": {
+            "Type": "AWS::IAM::Role",
+            "Properties": {
+                "AssumeRolePolicyDocument": {
+                    "Version": "2012-10-17",
+                    "Statement": [
+                        {
+                            "Effect": "Allow",
+                            "Principal": {
+                                "Service": "lambda.amazonaws.com"
+                            },
+                            "Action": "sts:AssumeRole"
+                        }
+                    ]
+                },
+                "ManagedPolicyArns": [
+                    "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
+                ],
+                "Policies": [
                     {
-                        "Fn::Equals": [
-                            {"Ref": "NotificationTopicArn"},
-                            ""
-                        ]
+                        "PolicyName": "S3BlockPublicAccessPolicy",
+                        "PolicyDocument": {
+                            "Version": "2012-10-17",
+                            "Statement": [
+                                {
+                                    "Effect": "Allow",
+                                    "Action": [
+                                        "s3:GetAccountPublicAccessBlock",
+                                        "s3:PutAccountPublicAccessBlock",
+                                        "sts:GetCallerIdentity"
+                                    ],
+                                    "Resource": "*"
+                                },
+                                {
+                                    "Effect": "Allow",
+                                    "Action": [
+                                        "sns:Publish"
+                                    ],
+                                    "Resource": {
+                                        "Fn::If": [
+                                            "HasNotificationTopic",
+                                            {"Ref": "NotificationTopicArn"},
+                                            {"Ref": "AWS::NoValue"}
+                                        ]
+                                    }
+                                }
+                            ]
+                        }
                     }
                 ]
             }
         },
         
-        "Resources": {
-            "S3BPALambdaRole": {
-                "Type": "AWS::IAM::Role",
-                "Properties": {
-                    "AssumeRolePolicyDocument": {
-                        "Version": "2012-10-17",
-                        "Statement": [
-                            {
-                                "Effect": "Allow",
-                                "Principal": {
-                                    "Service": "lambda.amazonaws.com"
-                                },
-                                "Action": "sts:AssumeRole"
-                            }
-                        ]
-                    },
-                    "ManagedPolicyArns": [
-                        "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
-                    ],
-                    "Policies": [
-                        {
-                            "PolicyName": "S3BlockPublicAccessPolicy",
-                            "PolicyDocument": {
-                                "Version": "2012-10-17",
-                                "Statement": [
-                                    {
-                                        "Effect": "Allow",
-                                        "Action": [
-                                            "s3:GetAccountPublicAccessBlock",
-                                            "s3:PutAccountPublicAccessBlock",
-                                            "sts:GetCallerIdentity"
-                                        ],
-                                        "Resource": "*"
-                                    },
-                                    {
-                                        "Effect": "Allow",
-                                        "Action": [
-                                            "sns:Publish"
-                                        ],
-                                        "Resource": {
-                                            "Fn::If": [
-                                                "HasNotificationTopic",
-                                                {"Ref": "NotificationTopicArn"},
-                                                {"Ref": "AWS::NoValue"}
-                                            ]
-                                        }
-                                    }
-                                ]
-                            }
-                        }
-                    ]
-                }
-            },
-            
-            "S3BPALambdaFunction": {
-                "Type": "AWS::Lambda::Function",
-                "Properties": {
-                    "FunctionName": {"Fn::Sub": "${AWS::StackName}-s3-bpa-handler"},
-                    "Runtime": "python3.11",
-                    "Handler": "index.lambda_handler",
-                    "Role": {"Fn::GetAtt": ["S3BPALambdaRole", "Arn"]},
-                    "Timeout": 300,
-                    "MemorySize": 128,
-                    "Code": {
-                        "ZipFile": generate_embedded_lambda_code_for_json()
-                    }
-                }
-            },
-            
-            "S3BlockPublicAccessResource": {
-                "Type": "AWS::CloudFormation::CustomResource",
-                "Properties": {
-                    "ServiceToken": {"Fn::GetAtt": ["S3BPALambdaFunction", "Arn"]},
-                    "NotificationTopicArn": {
-                        "Fn::If": [
-                            "HasNotificationTopic",
-                            {"Ref": "NotificationTopicArn"},
-                            {"Ref": "AWS::NoValue"}
-                        ]
-                    }
+        "S3BPALambdaFunction": {
+            "Type": "AWS::Lambda::Function",
+            "Properties": {
+                "FunctionName": {"Fn::Sub": "${AWS::StackName}-s3-bpa-handler"},
+                "Runtime": "python3.11",
+                "Handler": "index.lambda_handler",
+                "Role": {"Fn::GetAtt": ["S3BPALambdaRole", "Arn"]},
+                "Timeout": 300,
+                "MemorySize": 128,
+                "Code": {
+                    "ZipFile": None  # injected by build_cloudformation_template
                 }
             }
         },
         
-        "Outputs": {
-            "AccountId": {
-                "Description": "AWS Account ID where S3 Block Public Access was configured",
-                "Value": {"Fn::Sub": "${AWS::AccountId}"}
-            },
-            "S3BlockPublicAccessStatus": {
-                "Description": "Current S3 Block Public Access status (all settings enabled)",
-                "Value": "Fully Enabled - All 4 BPA settings are active"
-            },
-            "BlockPublicAcls": {
-                "Description": "Block Public ACLs status",
-                "Value": {"Fn::GetAtt": ["S3BlockPublicAccessResource", "BlockPublicAcls"]}
-            },
-            "IgnorePublicAcls": {
-                "Description": "Ignore Public ACLs status", 
-                "Value": {"Fn::GetAtt": ["S3BlockPublicAccessResource", "IgnorePublicAcls"]}
-            },
-            "BlockPublicPolicy": {
-                "Description": "Block Public Policy status",
-                "Value": {"Fn::GetAtt": ["S3BlockPublicAccessResource", "BlockPublicPolicy"]}
-            },
-            "RestrictPublicBuckets": {
-                "Description": "Restrict Public Buckets status",
-                "Value": {"Fn::GetAtt": ["S3BlockPublicAccessResource", "RestrictPublicBuckets"]}
-            },
-            "ConfigurationChanged": {
-                "Description": "Whether BPA configuration was changed during deployment",
-                "Value": {"Fn::GetAtt": ["S3BlockPublicAccessResource", "ConfigurationChanged"]}
-            },
-            "LastUpdated": {
-                "Description": "Timestamp when BPA configuration was last processed",
-                "Value": {"Fn::GetAtt": ["S3BlockPublicAccessResource", "Timestamp"]}
+        "S3BlockPublicAccessResource": {
+            "Type": "AWS::CloudFormation::CustomResource",
+            "Properties": {
+                "ServiceToken": {"Fn::GetAtt": ["S3BPALambdaFunction", "Arn"]},
+                "NotificationTopicArn": {
+                    "Fn::If": [
+                        "HasNotificationTopic",
+                        {"Ref": "NotificationTopicArn"},
+                        {"Ref": "AWS::NoValue"}
+                    ]
+                },
+                "SuppressNoOpNotifications": {"Ref": "SuppressNoOpNotifications"}
             }
         }
-    }
+    },
     
-    return template
+    "Outputs": {
+        "AccountId": {
+            "Description": "AWS Account ID where S3 Block Public Access was configured",
+            "Value": {"Fn::Sub": "${AWS::AccountId}"}
+        },
+        "S3BlockPublicAccessStatus": {
+            "Description": "Current S3 Block Public Access status (all settings enabled)",
+            "Value": "Fully Enabled - All 4 BPA settings are active"
+        },
+        "BlockPublicAcls": {
+            "Description": "Block Public ACLs status",
+            "Value": {"Fn::GetAtt": ["S3BlockPublicAccessResource", "BlockPublicAcls"]}
+        },
+        "IgnorePublicAcls": {
+            "Description": "Ignore Public ACLs status", 
+            "Value": {"Fn::GetAtt": ["S3BlockPublicAccessResource", "IgnorePublicAcls"]}
+        },
+        "BlockPublicPolicy": {
+            "Description": "Block Public Policy status",
+            "Value": {"Fn::GetAtt": ["S3BlockPublicAccessResource", "BlockPublicPolicy"]}
+        },
+        "RestrictPublicBuckets": {
+            "Description": "Restrict Public Buckets status",
+            "Value": {"Fn::GetAtt": ["S3BlockPublicAccessResource", "RestrictPublicBuckets"]}
+        },
+        "ConfigurationChanged": {
+            "Description": "Whether BPA configuration was changed during deployment",
+            "Value": {"Fn::GetAtt": ["S3BlockPublicAccessResource", "ConfigurationChanged"]}
+        },
+        "LastUpdated": {
+            "Description": "Timestamp when BPA configuration was last processed",
+            "Value": {"Fn::GetAtt": ["S3BlockPublicAccessResource", "Timestamp"]}
+        }
+    }
+}
 
-def generate_cloudformation_template_yaml():
-    """Generate CloudFormation template for YAML format with readable code embedding"""
-    
-    # Start with the JSON template structure
-    template = generate_cloudformation_template_json()
-    
-    # Replace the ZipFile content with the YAML-formatted version
-    template["Resources"]["S3BPALambdaFunction"]["Properties"]["Code"]["ZipFile"] = generate_embedded_lambda_code_for_yaml()
-    
+def build_cloudformation_template(lambda_code):
+    """Clone the static template structure and embed the given Lambda code"""
+    # A JSON round trip clones pure-data dicts much faster than copy.deepcopy
+    template = json.loads(json.dumps(_TEMPLATE_BASE))
+    template["Resources"]["S3BPALambdaFunction"]["Properties"]["Code"]["ZipFile"] = lambda_code
     return template
 
-def main():
+def generate_cloudformation_template_json():
+    """Generate CloudFormation template for JSON format"""
+    return build_cloudformation_template(generate_embedded_lambda_code_for_json())
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument(
+        '--json-only',
+        action='store_true',
+        help='Only write the JSON template, skipping YAML serialization'
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Generate and save CloudFormation template"""
     
+    args = parse_args(argv)
+    
     # Generate JSON template
     json_template = generate_cloudformation_template_json()
     
-    # Generate YAML template with readable code embedding
-    yaml_template = generate_cloudformation_template_yaml()
-    
     # Save as JSON
     with open('s3-bpa-custom-resource.json', 'w') as f:
-        json.dump(json_template, f, indent=2)
-    
-    # Save as YAML with custom formatting for the Lambda code
-    with open('s3-bpa-custom-resource.yaml', 'w') as f:
-        # Use a custom YAML dumper to handle the literal block scalar
-        yaml_content = yaml.dump(yaml_template, default_flow_style=False, indent=2)
-        
-        # Replace the ZipFile content with literal block scalar format
-        lambda_code = generate_embedded_lambda_code_for_yaml()
-        
-        # Find and replace the ZipFile section with literal block scalar
-        import re
-        
-        # First, find the ZipFile line and replace it with a placeholder
-        lines = yaml_content.split('\n')
-        new_lines = []
-        in_zipfile = False
-        zipfile_indent = 0
-        
-        for line in lines:
-            if 'ZipFile:' in line and not in_zipfile:
-                # Found the start of ZipFile, replace with literal block scalar
-                zipfile_indent = len(line) - len(line.lstrip())
-                new_lines.append(line.split('ZipFile:')[0] + 'ZipFile: |')
-                
-                # Add the lambda code with proper indentation
-                code_lines = lambda_code.split('\n')
-                for code_line in code_lines:
-                    if code_line.strip():  # Only add indentation to non-empty lines
-                        new_lines.append(' ' * (zipfile_indent + 2) + code_line)
-                    else:
-                        new_lines.append('')  # Empty lines remain empty
-                in_zipfile = True
-            elif in_zipfile and line.strip() and not line.startswith(' ' * (zipfile_indent + 1)):
-                # We've reached the end of the ZipFile content
-                in_zipfile = False
-                new_lines.append(line)
-            elif not in_zipfile:
-                # Normal line, keep as is
-                new_lines.append(line)
-            # Skip lines that are part of the original ZipFile content
-        
-        yaml_content = '\n'.join(new_lines)
-        
-        f.write(yaml_content)
+        f.write(json.dumps(json_template, indent=2))
     
     print("CloudFormation templates generated:")
     print("- s3-bpa-custom-resource.json")
-    print("- s3-bpa-custom-resource.yaml")
+    
+    if not args.json_only:
+        # Generate YAML template with readable code embedding
+        yaml_template = build_cloudformation_template(generate_embedded_lambda_code_for_yaml())
+        
+        # Save as YAML; the Lambda code is emitted as a literal block scalar
+        with open('s3-bpa-custom-resource.yaml', 'w') as f:
+            yaml.dump(yaml_template, f, Dumper=SafeDumper, default_flow_style=False, indent=2)
+        
+        print("- s3-bpa-custom-resource.yaml")
     
     # Validate the embedded code by running our tests against it
     print("\nValidating embedded code logic...")
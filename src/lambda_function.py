@@ -3,20 +3,72 @@ import logging
 import boto3
 from botocore.exceptions import ClientError
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import urllib3
 
+try:
+    import orjson
+
+    def _json_dumps(obj, indent=None):
+        # orjson only supports two-space indentation, which is all we use
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+except ImportError:
+    def _json_dumps(obj, indent=None):
+        return json.dumps(obj, indent=indent)
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# UPDATE and DELETE are no-ops, so their response strings are built once
+_NOOP_REASONS = {rt: f'{rt} operation completed' for rt in ('Update', 'Delete')}
+_NOOP_MESSAGES = {rt: f'{rt} operation completed - no changes made' for rt in _NOOP_REASONS}
+
+# boto3 clients are created on first use and reused across warm invocations
+_sts_client = None
+_s3control_client = None
+_sns_client = None
+
+# Shared HTTP pool so warm invocations keep the connection to CloudFormation alive
+_http = urllib3.PoolManager(maxsize=4, retries=urllib3.Retry(total=3, backoff_factor=0.1))
+
+def _get_sts_client():
+    global _sts_client
+    if _sts_client is None:
+        _sts_client = boto3.client('sts')
+    return _sts_client
+
+def _get_s3control_client():
+    global _s3control_client
+    if _s3control_client is None:
+        _s3control_client = boto3.client('s3control')
+    return _s3control_client
+
+def _get_sns_client():
+    global _sns_client
+    if _sns_client is None:
+        _sns_client = boto3.client('sns')
+    return _sns_client
+
 def get_account_id():
     """Get AWS Account ID from STS"""
-    sts_client = boto3.client('sts')
-    return sts_client.get_caller_identity()['Account']
+    return _get_sts_client().get_caller_identity()['Account']
+
+@lru_cache(maxsize=32)
+def get_account_id_from_stack_id(stack_id):
+    """Get AWS Account ID from the CloudFormation stack ARN, None if it is not an ARN"""
+    # arn:aws:cloudformation:<region>:<account>:stack/<name>/<uuid>
+    prefix, _, rest = stack_id.partition(':')
+    if prefix != 'arn':
+        return None
+    for _ in range(3):
+        _, _, rest = rest.partition(':')
+    account_id, sep, _ = rest.partition(':')
+    return account_id if sep else None
 
 def get_current_bpa_config(account_id):
     try:
-        s3control_client = boto3.client('s3control')
-        response = s3control_client.get_public_access_block(AccountId=account_id)
+        response = _get_s3control_client().get_public_access_block(AccountId=account_id)
         config = response.get('PublicAccessBlockConfiguration', {})
         return {
             'BlockPublicAcls': config.get('BlockPublicAcls', True),
@@ -30,20 +82,21 @@ def get_current_bpa_config(account_id):
         raise
 
 def apply_bpa_config(config, account_id):
-    s3control_client = boto3.client('s3control')
-    s3control_client.put_public_access_block(
+    _get_s3control_client().put_public_access_block(
         AccountId=account_id,
         PublicAccessBlockConfiguration=config
     )
     return config
 
+def _pack_bpa_config(config):
+    """Pack the four boolean BPA settings into a 4-bit integer"""
+    return (config['BlockPublicAcls'] |
+            config['IgnorePublicAcls'] << 1 |
+            config['BlockPublicPolicy'] << 2 |
+            config['RestrictPublicBuckets'] << 3)
+
 def configs_equal(current, desired):
-    if current is None:
-        return False
-    return (current['BlockPublicAcls'] == desired['BlockPublicAcls'] and
-            current['IgnorePublicAcls'] == desired['IgnorePublicAcls'] and
-            current['BlockPublicPolicy'] == desired['BlockPublicPolicy'] and
-            current['RestrictPublicBuckets'] == desired['RestrictPublicBuckets'])
+    return current is not None and _pack_bpa_config(current) == _pack_bpa_config(desired)
 
 def get_desired_config():
     """Always return full BPA configuration - all settings enabled for maximum security"""
@@ -59,15 +112,14 @@ def send_sns_notification(topic_arn, subject, message):
         return
     
     try:
-        sns_client = boto3.client('sns')
-        sns_client.publish(
+        _get_sns_client().publish(
             TopicArn=topic_arn,
             Subject=subject,
             Message=message
         )
-        logger.info(f"SNS notification sent to {topic_arn}")
+        logger.info("SNS notification sent to %s", topic_arn)
     except Exception as e:
-        logger.error(f"Failed to send SNS notification: {str(e)}")
+        logger.error("Failed to send SNS notification: %s", e)
 
 def send_response(event, context, status, reason, data=None):
     response_body = {
@@ -85,24 +137,39 @@ def send_response(event, context, status, reason, data=None):
     response_url = event['ResponseURL']
     
     try:
-        http = urllib3.PoolManager()
-        response = http.request('PUT', response_url, 
-                              body=json.dumps(response_body),
-                              headers={'Content-Type': 'application/json'})
-        logger.info(f"Response sent: {response.status}")
+        response = _http.request('PUT', response_url, 
+                                 body=_json_dumps(response_body),
+                                 headers={'Content-Type': 'application/json'})
+        logger.info("Response sent: %s", response.status)
     except Exception as e:
-        logger.error(f"Failed to send response: {str(e)}")
+        logger.error("Failed to send response: %s", e)
+
+def notify_and_send_response(topic_arn, subject, message, event, context, status, reason, data=None):
+    """Publish the SNS notification and the CloudFormation response concurrently"""
+    # Both calls are independent network round trips; failures outside their own
+    # error handling (e.g. a malformed event in send_response) are re-raised here
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(send_sns_notification, topic_arn, subject, message),
+            executor.submit(send_response, event, context, status, reason, data)
+        ]
+        for future in futures:
+            future.result()
 
 def handle_create(event, context, properties):
     logger.info("Handling CREATE operation - applying full S3 Block Public Access")
     
-    account_id = get_account_id()
+    # The stack ARN already carries the account, saving an STS round trip
+    account_id = get_account_id_from_stack_id(event.get('StackId', '')) or get_account_id()
     desired_config = get_desired_config()  # Always full BPA protection
     current_config = get_current_bpa_config(account_id)
     topic_arn = properties.get('NotificationTopicArn')
     
     if configs_equal(current_config, desired_config):
         logger.info("S3 Block Public Access already fully enabled")
+        if str(properties.get('SuppressNoOpNotifications', 'false')).lower() == 'true':
+            # Nothing changed, so skip the SNS round trip
+            topic_arn = None
         config_changed = False
         final_config = current_config
         message = "S3 Block Public Access already fully enabled at account level"
@@ -112,13 +179,14 @@ def handle_create(event, context, properties):
         config_changed = True
         message = "S3 Block Public Access fully enabled at account level"
     
+    timestamp = datetime.utcnow().isoformat()
     data = {
         'BlockPublicAcls': final_config['BlockPublicAcls'],
         'IgnorePublicAcls': final_config['IgnorePublicAcls'],
         'BlockPublicPolicy': final_config['BlockPublicPolicy'],
         'RestrictPublicBuckets': final_config['RestrictPublicBuckets'],
         'ConfigurationChanged': config_changed,
-        'Timestamp': datetime.utcnow().isoformat()
+        'Timestamp': timestamp
     }
     
     notification_message = {
@@ -127,19 +195,18 @@ def handle_create(event, context, properties):
         'AccountId': account_id,
         'Configuration': final_config,
         'ConfigurationChanged': config_changed,
-        'Timestamp': data['Timestamp']
+        'Timestamp': timestamp
     }
     
-    send_sns_notification(
+    notify_and_send_response(
         topic_arn,
         'S3 Block Public Access - Configuration Applied',
-        json.dumps(notification_message, indent=2)
+        _json_dumps(notification_message, indent=2),
+        event, context, 'SUCCESS', message, data
     )
-    
-    send_response(event, context, 'SUCCESS', message, data)
 
 def lambda_handler(event, context):
-    logger.info(f"Received {event['RequestType']} request")
+    logger.info("Received %s request", event['RequestType'])
     
     try:
         request_type = event['RequestType']
@@ -148,20 +215,20 @@ def lambda_handler(event, context):
         
         if request_type == 'Create':
             handle_create(event, context, properties)
-        elif request_type in ['Update', 'Delete']:
-            logger.info(f"{request_type} operation - no action needed, returning success")
+        elif request_type in _NOOP_REASONS:
+            logger.info("%s operation - no action needed, returning success", request_type)
             data = {
-                'Message': f'{request_type} operation completed - no changes made',
+                'Message': _NOOP_MESSAGES[request_type],
                 'Timestamp': datetime.utcnow().isoformat()
             }
-            send_response(event, context, 'SUCCESS', f'{request_type} operation completed', data)
+            send_response(event, context, 'SUCCESS', _NOOP_REASONS[request_type], data)
         else:
             raise ValueError(f"Unsupported request type: {request_type}")
             
     except ClientError as e:
         error_code = e.response['Error']['Code']
         error_message = e.response['Error']['Message']
-        logger.error(f"AWS API error: {error_code} - {error_message}")
+        logger.error("AWS API error: %s - %s", error_code, error_message)
         
         if error_code == 'AccessDenied':
             reason = "Insufficient permissions to modify S3 Block Public Access settings"
@@ -176,16 +243,15 @@ def lambda_handler(event, context):
         }
         
         topic_arn = event.get('ResourceProperties', {}).get('NotificationTopicArn')
-        send_sns_notification(
+        notify_and_send_response(
             topic_arn,
             'S3 Block Public Access - Configuration Failed',
-            json.dumps(notification_message, indent=2)
+            _json_dumps(notification_message, indent=2),
+            event, context, 'FAILED', reason
         )
-            
-        send_response(event, context, 'FAILED', reason)
         
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: %s", e)
         
         notification_message = {
             'Status': 'FAILED',
@@ -194,10 +260,9 @@ def lambda_handler(event, context):
         }
         
         topic_arn = event.get('ResourceProperties', {}).get('NotificationTopicArn')
-        send_sns_notification(
+        notify_and_send_response(
             topic_arn,
             'S3 Block Public Access - Internal Error',
-            json.dumps(notification_message, indent=2)
-        )
-        
-        send_response(event, context, 'FAILED', f"Internal error: {str(e)}")
\ No newline at end of file
+            _json_dumps(notification_message, indent=2),
+            event, context, 'FAILED', f"Internal error: {str(e)}"
+        )
\ No newline at end of file
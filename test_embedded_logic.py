@@ -1,213 +1,216 @@
-#!/usr/bin/env python3
 """
-Test script to validate the embedded Lambda logic works correctly
+Tests validating the embedded Lambda logic works correctly
 """
 
 import json
-import sys
-from unittest.mock import MagicMock, patch
-from datetime import datetime
+import logging
+import time
+from functools import lru_cache
+
+import pytest
+
+try:
+    import orjson
+
+    def _json_dumps(obj):
+        return orjson.dumps(obj, default=str).decode()
+except ImportError:
+    def _json_dumps(obj):
+        return json.dumps(obj, default=str)
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+_DEFAULT_BPA = {
+    'BlockPublicAcls': True,
+    'IgnorePublicAcls': True,
+    'BlockPublicPolicy': True,
+    'RestrictPublicBuckets': True
+}
+_BPA_KEYS = tuple(_DEFAULT_BPA)
+
+_BOOL_STR = {True: 'True', False: 'False'}
+_DEFAULT_BPA_DATA = {key: _BOOL_STR[value] for key, value in _DEFAULT_BPA.items()}
+
+# Static parts of the custom resource responses, copied and filled in per request
+_SUCCESS_RESPONSE = {'Status': 'SUCCESS'}
+_FAILED_RESPONSE = {'Status': 'FAILED'}
+
+def _flag_str(value):
+    """str() for a BPA flag, using the precomputed strings for real booleans"""
+    return _BOOL_STR[value] if isinstance(value, bool) else str(value)
+
+def _utc_timestamp():
+    """UTC ISO 8601 timestamp with microseconds, without building a datetime"""
+    seconds, nanos = divmod(time.time_ns(), 1_000_000_000)
+    return f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds))}.{nanos // 1000:06d}"
+
+@lru_cache(maxsize=32)
+def _account_from_stack_arn(arn):
+    """Return the account field of a stack ARN without splitting the whole string"""
+    # arn:aws:cloudformation:<region>:<account>:stack/<name>/<uuid>
+    rest = arn
+    for _ in range(4):
+        _, _, rest = rest.partition(':')
+    account, sep, _ = rest.partition(':')
+    if not sep:
+        raise ValueError(f"Not a CloudFormation stack ARN: {arn}")
+    return account
+
+class _LazyJSON:
+    """Defer JSON serialization until a log handler actually formats the record"""
+    
+    def __init__(self, obj):
+        self.obj = obj
+    
+    def __str__(self):
+        return _json_dumps(self.obj)
 
 # Simulate the embedded Lambda code
 def embedded_lambda_handler(event, context):
     """
     Simplified version of the embedded Lambda code for testing
     """
-    import json
-    import logging
-    from datetime import datetime
-    
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    
     try:
-        logger.info(f"Received event: {json.dumps(event, default=str)}")
+        logger.info("Received event: %s", _LazyJSON(event))
         
         request_type = event['RequestType']
         properties = event.get('ResourceProperties', {})
         
-        # Extract BPA configuration with defaults
-        bpa_config = {
-            'BlockPublicAcls': properties.get('BlockPublicAcls', True),
-            'IgnorePublicAcls': properties.get('IgnorePublicAcls', True),
-            'BlockPublicPolicy': properties.get('BlockPublicPolicy', True),
-            'RestrictPublicBuckets': properties.get('RestrictPublicBuckets', True)
-        }
+        # Extract BPA configuration with defaults; the shared default is never mutated
+        if not properties:
+            bpa_config = _DEFAULT_BPA
+        else:
+            get_property = properties.get
+            bpa_config = {key: get_property(key, True) for key in _BPA_KEYS}
         
         # Get account ID from stack ARN
-        account_id = event['StackId'].split(':')[4]
+        account_id = _account_from_stack_arn(event['StackId'])
         physical_resource_id = f"account-bpa-{account_id}"
         
         # Mock S3 operations for testing
         current_config = bpa_config  # Simulate successful application
         
+        data = {'AccountId': account_id}
+        if current_config is _DEFAULT_BPA:
+            data.update(_DEFAULT_BPA_DATA)
+        else:
+            data.update({key: _flag_str(current_config[key]) for key in _BPA_KEYS})
+        data['Timestamp'] = _utc_timestamp()
+        
         # Return success response
-        return {
-            'Status': 'SUCCESS',
-            'Reason': f'Successfully processed {request_type} request',
-            'PhysicalResourceId': physical_resource_id,
-            'StackId': event['StackId'],
-            'RequestId': event['RequestId'],
-            'LogicalResourceId': event['LogicalResourceId'],
-            'Data': {
-                'AccountId': account_id,
-                'BlockPublicAcls': str(current_config.get('BlockPublicAcls', True)),
-                'IgnorePublicAcls': str(current_config.get('IgnorePublicAcls', True)),
-                'BlockPublicPolicy': str(current_config.get('BlockPublicPolicy', True)),
-                'RestrictPublicBuckets': str(current_config.get('RestrictPublicBuckets', True)),
-                'Timestamp': datetime.utcnow().isoformat()
-            }
-        }
+        response = _SUCCESS_RESPONSE.copy()
+        response.update(
+            Reason=f'Successfully processed {request_type} request',
+            PhysicalResourceId=physical_resource_id,
+            StackId=event['StackId'],
+            RequestId=event['RequestId'],
+            LogicalResourceId=event['LogicalResourceId'],
+            Data=data
+        )
+        return response
         
     except Exception as e:
-        logger.error(f"Error processing request: {str(e)}", exc_info=True)
+        error_message = str(e)
+        logger.error("Error processing request: %s", error_message)
+        # The traceback is only formatted when DEBUG logging is enabled
+        logger.debug("Error processing request", exc_info=True)
         
-        # Try to get account_id for physical resource ID, fallback if not available
-        try:
-            account_id = event['StackId'].split(':')[4]
-            fallback_physical_id = f"failed-{account_id}"
-        except:
+        get_field = event.get
+        
+        # Use account_id for physical resource ID when the stack ARN is usable
+        stack_id = get_field('StackId')
+        if stack_id and stack_id.count(':') >= 5:
+            fallback_physical_id = f"failed-{_account_from_stack_arn(stack_id)}"
+        else:
             fallback_physical_id = "failed-resource"
         
-        return {
-            'Status': 'FAILED',
-            'Reason': f'Failed to process {event.get("RequestType", "Unknown")} request: {str(e)}',
-            'PhysicalResourceId': event.get('PhysicalResourceId', fallback_physical_id),
-            'StackId': event.get('StackId', 'unknown-stack'),
-            'RequestId': event.get('RequestId', 'unknown-request'),
-            'LogicalResourceId': event.get('LogicalResourceId', 'unknown-resource')
-        }
-
-def test_create_operation():
-    """Test CREATE operation"""
-    event = {
-        'RequestType': 'Create',
-        'StackId': 'arn:aws:cloudformation:us-east-1:123456789012:stack/test-stack/uuid',
+        response = _FAILED_RESPONSE.copy()
+        response.update(
+            Reason=f'Failed to process {get_field("RequestType", "Unknown")} request: {error_message}',
+            PhysicalResourceId=get_field('PhysicalResourceId', fallback_physical_id),
+            StackId=get_field('StackId', 'unknown-stack'),
+            RequestId=get_field('RequestId', 'unknown-request'),
+            LogicalResourceId=get_field('LogicalResourceId', 'unknown-resource')
+        )
+        return response
+
+@pytest.fixture(scope='session')
+def base_event():
+    """Fields shared by every CloudFormation event in these tests"""
+    return {
         'RequestId': 'test-request-id',
-        'LogicalResourceId': 'S3BlockPublicAccess',
-        'ResourceProperties': {
+        'LogicalResourceId': 'S3BlockPublicAccess'
+    }
+
+@pytest.mark.parametrize('request_type,stack_id,properties,expected_data', [
+    pytest.param(
+        'Create',
+        'arn:aws:cloudformation:us-east-1:123456789012:stack/test-stack/uuid',
+        {
             'BlockPublicAcls': True,
             'IgnorePublicAcls': True,
             'BlockPublicPolicy': False,
             'RestrictPublicBuckets': True
-        }
-    }
-    
-    context = MagicMock()
-    response = embedded_lambda_handler(event, context)
-    
-    assert response['Status'] == 'SUCCESS'
-    assert response['PhysicalResourceId'] == 'account-bpa-123456789012'
-    assert response['Data']['AccountId'] == '123456789012'
-    assert response['Data']['BlockPublicAcls'] == 'True'
-    assert response['Data']['BlockPublicPolicy'] == 'False'
-    
-    print("✅ CREATE operation test passed")
-
-def test_update_operation():
-    """Test UPDATE operation"""
-    event = {
-        'RequestType': 'Update',
-        'StackId': 'arn:aws:cloudformation:us-west-2:987654321098:stack/test-stack/uuid',
-        'RequestId': 'test-request-id-2',
-        'LogicalResourceId': 'S3BlockPublicAccess',
-        'PhysicalResourceId': 'account-bpa-987654321098',
-        'ResourceProperties': {
+        },
+        {'AccountId': '123456789012', 'BlockPublicAcls': 'True', 'BlockPublicPolicy': 'False'},
+        id='create'
+    ),
+    pytest.param(
+        'Update',
+        'arn:aws:cloudformation:us-west-2:987654321098:stack/test-stack/uuid',
+        {
             'BlockPublicAcls': False,
             'IgnorePublicAcls': True,
             'BlockPublicPolicy': True,
             'RestrictPublicBuckets': False
-        }
-    }
-    
-    context = MagicMock()
-    response = embedded_lambda_handler(event, context)
-    
-    assert response['Status'] == 'SUCCESS'
-    assert response['PhysicalResourceId'] == 'account-bpa-987654321098'
-    assert response['Data']['AccountId'] == '987654321098'
-    assert response['Data']['BlockPublicAcls'] == 'False'
-    assert response['Data']['RestrictPublicBuckets'] == 'False'
-    
-    print("✅ UPDATE operation test passed")
-
-def test_delete_operation():
-    """Test DELETE operation"""
-    event = {
-        'RequestType': 'Delete',
-        'StackId': 'arn:aws:cloudformation:eu-west-1:555666777888:stack/test-stack/uuid',
-        'RequestId': 'test-request-id-3',
-        'LogicalResourceId': 'S3BlockPublicAccess',
-        'PhysicalResourceId': 'account-bpa-555666777888'
-    }
-    
-    context = MagicMock()
-    response = embedded_lambda_handler(event, context)
-    
-    assert response['Status'] == 'SUCCESS'
-    assert response['PhysicalResourceId'] == 'account-bpa-555666777888'
-    assert response['Data']['AccountId'] == '555666777888'
-    
-    print("✅ DELETE operation test passed")
-
-def test_default_properties():
-    """Test with default properties (empty ResourceProperties)"""
-    event = {
-        'RequestType': 'Create',
-        'StackId': 'arn:aws:cloudformation:ap-south-1:111222333444:stack/test-stack/uuid',
-        'RequestId': 'test-request-id-4',
-        'LogicalResourceId': 'S3BlockPublicAccess',
-        'ResourceProperties': {}  # Empty - should use defaults
-    }
-    
-    context = MagicMock()
-    response = embedded_lambda_handler(event, context)
+        },
+        {'AccountId': '987654321098', 'BlockPublicAcls': 'False', 'RestrictPublicBuckets': 'False'},
+        id='update'
+    ),
+    pytest.param(
+        'Delete',
+        'arn:aws:cloudformation:eu-west-1:555666777888:stack/test-stack/uuid',
+        None,  # DELETE events carry no ResourceProperties here
+        {'AccountId': '555666777888'},
+        id='delete'
+    ),
+    pytest.param(
+        'Create',
+        'arn:aws:cloudformation:ap-south-1:111222333444:stack/test-stack/uuid',
+        {},  # Empty - should use defaults
+        {
+            'AccountId': '111222333444',
+            'BlockPublicAcls': 'True',
+            'IgnorePublicAcls': 'True',
+            'BlockPublicPolicy': 'True',
+            'RestrictPublicBuckets': 'True'
+        },
+        id='default-properties'
+    ),
+])
+def test_successful_operation(base_event, request_type, stack_id, properties, expected_data):
+    """Test CREATE/UPDATE/DELETE operations and property defaults"""
+    event = dict(base_event, RequestType=request_type, StackId=stack_id)
+    if properties is not None:
+        event['ResourceProperties'] = properties
+    if request_type != 'Create':
+        event['PhysicalResourceId'] = f"account-bpa-{expected_data['AccountId']}"
+    
+    response = embedded_lambda_handler(event, None)
     
     assert response['Status'] == 'SUCCESS'
-    assert response['Data']['BlockPublicAcls'] == 'True'
-    assert response['Data']['IgnorePublicAcls'] == 'True'
-    assert response['Data']['BlockPublicPolicy'] == 'True'
-    assert response['Data']['RestrictPublicBuckets'] == 'True'
-    
-    print("✅ Default properties test passed")
+    assert response['PhysicalResourceId'] == f"account-bpa-{expected_data['AccountId']}"
+    for key, value in expected_data.items():
+        assert response['Data'][key] == value
 
-def test_error_handling():
+def test_error_handling(base_event):
     """Test error handling with invalid event"""
-    event = {
-        'RequestType': 'Create',
-        # Missing StackId - should cause error
-        'RequestId': 'test-request-id-5',
-        'LogicalResourceId': 'S3BlockPublicAccess'
-    }
+    # Missing StackId - should cause error
+    event = dict(base_event, RequestType='Create')
     
-    context = MagicMock()
-    response = embedded_lambda_handler(event, context)
+    response = embedded_lambda_handler(event, None)
     
     assert response['Status'] == 'FAILED'
     assert 'Failed to process Create request' in response['Reason']
-    
-    print("✅ Error handling test passed")
-
-def main():
-    """Run all tests"""
-    print("Testing embedded Lambda logic...")
-    print()
-    
-    try:
-        test_create_operation()
-        test_update_operation()
-        test_delete_operation()
-        test_default_properties()
-        test_error_handling()
-        
-        print()
-        print("🎉 All tests passed! The embedded Lambda logic is working correctly.")
-        print()
-        print("The CloudFormation template is ready for deployment!")
-        
-    except Exception as e:
-        print(f"❌ Test failed: {str(e)}")
-        sys.exit(1)
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+    assert response['PhysicalResourceId'] == 'failed-resource'
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the Lambda module importable as `lambda_function`, as it is inside the deployed function
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'src')))
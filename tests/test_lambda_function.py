@@ -1,38 +1,77 @@
 import unittest
 from unittest.mock import patch, MagicMock
 import json
-import sys
-import os
-
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from types import SimpleNamespace
 
+import lambda_function
 from lambda_function import (
     get_account_id,
+    get_account_id_from_stack_id,
     get_current_bpa_config,
     apply_bpa_config,
     configs_equal,
     get_desired_config,
     send_sns_notification,
+    send_response,
+    notify_and_send_response,
     handle_create,
     lambda_handler
 )
 
 
-class TestS3Operations(unittest.TestCase):
+# The handler only reads aws_request_id from the Lambda context
+LAMBDA_CONTEXT = SimpleNamespace(aws_request_id='test-request-id')
+
+# boto3.client is patched once for the whole module; BotoClientTestCase resets it per test
+_boto3_client_patcher = patch('lambda_function.boto3.client')
+_mock_boto3_client = None
+
+
+def setUpModule():
+    global _mock_boto3_client
+    _mock_boto3_client = _boto3_client_patcher.start()
+
+
+def tearDownModule():
+    _boto3_client_patcher.stop()
+    reset_cached_clients()
+
+
+def reset_cached_clients():
+    lambda_function._sts_client = None
+    lambda_function._s3control_client = None
+    lambda_function._sns_client = None
+
+
+class BotoClientTestCase(unittest.TestCase):
     
-    @patch('lambda_function.boto3.client')
-    def test_get_account_id(self, mock_boto3):
+    def setUp(self):
+        reset_cached_clients()
+        _mock_boto3_client.reset_mock(return_value=True, side_effect=True)
+        self.mock_boto3 = _mock_boto3_client
+
+
+class TestS3Operations(BotoClientTestCase):
+    
+    def test_get_account_id(self):
         mock_sts = MagicMock()
         mock_sts.get_caller_identity.return_value = {'Account': '123456789012'}
-        mock_boto3.return_value = mock_sts
+        self.mock_boto3.return_value = mock_sts
         
         account_id = get_account_id()
         
         self.assertEqual(account_id, '123456789012')
         mock_sts.get_caller_identity.assert_called_once()
     
-    @patch('lambda_function.boto3.client')
-    def test_get_current_bpa_config_success(self, mock_boto3):
+    def test_get_account_id_from_stack_id(self):
+        stack_id = 'arn:aws:cloudformation:us-east-1:123456789012:stack/test/uuid'
+        self.assertEqual(get_account_id_from_stack_id(stack_id), '123456789012')
+    
+    def test_get_account_id_from_stack_id_not_arn(self):
+        self.assertIsNone(get_account_id_from_stack_id('test-stack'))
+        self.assertIsNone(get_account_id_from_stack_id(''))
+    
+    def test_get_current_bpa_config_success(self):
         mock_s3control = MagicMock()
         mock_s3control.get_public_access_block.return_value = {
             'PublicAccessBlockConfiguration': {
@@ -42,7 +81,7 @@ class TestS3Operations(unittest.TestCase):
                 'RestrictPublicBuckets': False
             }
         }
-        mock_boto3.return_value = mock_s3control
+        self.mock_boto3.return_value = mock_s3control
         
         config = get_current_bpa_config('123456789012')
         
@@ -55,8 +94,7 @@ class TestS3Operations(unittest.TestCase):
         self.assertEqual(config, expected)
         mock_s3control.get_public_access_block.assert_called_once_with(AccountId='123456789012')
     
-    @patch('lambda_function.boto3.client')
-    def test_get_current_bpa_config_not_found(self, mock_boto3):
+    def test_get_current_bpa_config_not_found(self):
         from botocore.exceptions import ClientError
         
         mock_s3control = MagicMock()
@@ -67,15 +105,14 @@ class TestS3Operations(unittest.TestCase):
             }
         }
         mock_s3control.get_public_access_block.side_effect = ClientError(error_response, 'GetPublicAccessBlock')
-        mock_boto3.return_value = mock_s3control
+        self.mock_boto3.return_value = mock_s3control
         
         config = get_current_bpa_config('123456789012')
         self.assertIsNone(config)
     
-    @patch('lambda_function.boto3.client')
-    def test_apply_bpa_config(self, mock_boto3):
+    def test_apply_bpa_config(self):
         mock_s3control = MagicMock()
-        mock_boto3.return_value = mock_s3control
+        self.mock_boto3.return_value = mock_s3control
         
         config = {
             'BlockPublicAcls': True,
@@ -117,12 +154,39 @@ class TestS3Operations(unittest.TestCase):
         self.assertEqual(config, expected)
 
 
-class TestSNSNotification(unittest.TestCase):
+class TestClientReuse(BotoClientTestCase):
     
-    @patch('lambda_function.boto3.client')
-    def test_send_sns_notification_success(self, mock_boto3):
+    def test_sts_client_created_once(self):
+        self.mock_boto3.return_value.get_caller_identity.return_value = {'Account': '123456789012'}
+        
+        get_account_id()
+        get_account_id()
+        
+        self.mock_boto3.assert_called_once_with('sts')
+    
+    def test_s3control_client_shared_between_get_and_put(self):
+        config = get_desired_config()
+        
+        get_current_bpa_config('123456789012')
+        apply_bpa_config(config, '123456789012')
+        
+        self.mock_boto3.assert_called_once_with('s3control')
+    
+    def test_sns_client_created_once(self):
+        topic_arn = 'arn:aws:sns:us-east-1:123456789012:test-topic'
+        
+        send_sns_notification(topic_arn, 'Subject', 'Message')
+        send_sns_notification(topic_arn, 'Subject', 'Message')
+        
+        self.mock_boto3.assert_called_once_with('sns')
+        self.assertEqual(self.mock_boto3.return_value.publish.call_count, 2)
+
+
+class TestSNSNotification(BotoClientTestCase):
+    
+    def test_send_sns_notification_success(self):
         mock_sns = MagicMock()
-        mock_boto3.return_value = mock_sns
+        self.mock_boto3.return_value = mock_sns
         
         topic_arn = 'arn:aws:sns:us-east-1:123456789012:test-topic'
         subject = 'Test Subject'
@@ -130,7 +194,7 @@ class TestSNSNotification(unittest.TestCase):
         
         send_sns_notification(topic_arn, subject, message)
         
-        mock_boto3.assert_called_once_with('sns')
+        self.mock_boto3.assert_called_once_with('sns')
         mock_sns.publish.assert_called_once_with(
             TopicArn=topic_arn,
             Subject=subject,
@@ -142,14 +206,55 @@ class TestSNSNotification(unittest.TestCase):
         send_sns_notification(None, 'Subject', 'Message')
         send_sns_notification('', 'Subject', 'Message')
     
-    @patch('lambda_function.boto3.client')
-    def test_send_sns_notification_error(self, mock_boto3):
+    def test_send_sns_notification_error(self):
         mock_sns = MagicMock()
         mock_sns.publish.side_effect = Exception('SNS Error')
-        mock_boto3.return_value = mock_sns
+        self.mock_boto3.return_value = mock_sns
         
         # Should not raise exception, just log error
         send_sns_notification('arn:aws:sns:us-east-1:123456789012:test-topic', 'Subject', 'Message')
+    
+    @patch('lambda_function._http')
+    def test_send_response(self, mock_http):
+        event = {
+            'ResponseURL': 'https://test-url.com',
+            'StackId': 'test-stack',
+            'RequestId': 'test-request',
+            'LogicalResourceId': 'TestResource'
+        }
+        context = LAMBDA_CONTEXT
+        
+        send_response(event, context, 'SUCCESS', 'Reason', {'Key': 'Value'})
+        
+        mock_http.request.assert_called_once()
+        args, kwargs = mock_http.request.call_args
+        self.assertEqual(args, ('PUT', 'https://test-url.com'))
+        body = json.loads(kwargs['body'])
+        self.assertEqual(body['Status'], 'SUCCESS')
+        self.assertEqual(body['PhysicalResourceId'], 'account-bpa-test-request-id')
+        self.assertEqual(body['Data'], {'Key': 'Value'})
+    
+    @patch('lambda_function.send_response')
+    @patch('lambda_function.send_sns_notification')
+    def test_notify_and_send_response(self, mock_send_sns, mock_send_response):
+        event = {'StackId': 'test-stack'}
+        context = LAMBDA_CONTEXT
+        topic_arn = 'arn:aws:sns:us-east-1:123456789012:test-topic'
+        
+        notify_and_send_response(topic_arn, 'Subject', 'Message', event, context, 'SUCCESS', 'Reason', {'Key': 'Value'})
+        
+        mock_send_sns.assert_called_once_with(topic_arn, 'Subject', 'Message')
+        mock_send_response.assert_called_once_with(event, context, 'SUCCESS', 'Reason', {'Key': 'Value'})
+    
+    @patch('lambda_function.send_response')
+    @patch('lambda_function.send_sns_notification')
+    def test_notify_and_send_response_propagates_errors(self, mock_send_sns, mock_send_response):
+        mock_send_response.side_effect = KeyError('ResponseURL')
+        
+        with self.assertRaises(KeyError):
+            notify_and_send_response(None, 'Subject', 'Message', {}, LAMBDA_CONTEXT, 'FAILED', 'Reason')
+        
+        mock_send_sns.assert_called_once()
 
 
 class TestCreateHandler(unittest.TestCase):
@@ -164,8 +269,7 @@ class TestCreateHandler(unittest.TestCase):
             'ResourceProperties': {}
         }
         
-        self.context = MagicMock()
-        self.context.aws_request_id = 'test-request-id'
+        self.context = LAMBDA_CONTEXT
     
     @patch('lambda_function.send_response')
     @patch('lambda_function.send_sns_notification')
@@ -186,6 +290,7 @@ class TestCreateHandler(unittest.TestCase):
         
         handle_create(self.event, self.context, properties)
         
+        mock_get_account_id.assert_not_called()
         mock_get_current.assert_called_once_with('123456789012')
         mock_apply.assert_called_once_with(mock_apply.call_args[0][0], '123456789012')
         mock_send_sns.assert_called_once()
@@ -228,6 +333,44 @@ class TestCreateHandler(unittest.TestCase):
         self.assertEqual(response_args[0][2], 'SUCCESS')
         self.assertFalse(response_args[0][4]['ConfigurationChanged'])
     
+    @patch('lambda_function.send_response')
+    @patch('lambda_function.send_sns_notification')
+    @patch('lambda_function.get_current_bpa_config')
+    @patch('lambda_function.get_account_id')
+    def test_handle_create_suppress_noop_notification(self, mock_get_account_id, mock_get_current, mock_send_sns, mock_send_response):
+        mock_get_current.return_value = get_desired_config()
+        
+        properties = {
+            'NotificationTopicArn': 'arn:aws:sns:us-east-1:123456789012:test-topic',
+            'SuppressNoOpNotifications': 'true'
+        }
+        
+        handle_create(self.event, self.context, properties)
+        
+        # Nothing changed, so the notification is skipped via a None topic
+        sns_args = mock_send_sns.call_args
+        self.assertIsNone(sns_args[0][0])
+        response_args = mock_send_response.call_args
+        self.assertEqual(response_args[0][2], 'SUCCESS')
+        self.assertFalse(response_args[0][4]['ConfigurationChanged'])
+    
+    @patch('lambda_function.send_response')
+    @patch('lambda_function.send_sns_notification')
+    @patch('lambda_function.apply_bpa_config')
+    @patch('lambda_function.get_current_bpa_config')
+    @patch('lambda_function.get_account_id')
+    def test_handle_create_suppress_noop_still_notifies_on_change(self, mock_get_account_id, mock_get_current, mock_apply, mock_send_sns, mock_send_response):
+        mock_get_current.return_value = None
+        mock_apply.return_value = get_desired_config()
+        
+        topic_arn = 'arn:aws:sns:us-east-1:123456789012:test-topic'
+        properties = {'NotificationTopicArn': topic_arn, 'SuppressNoOpNotifications': 'true'}
+        
+        handle_create(self.event, self.context, properties)
+        
+        sns_args = mock_send_sns.call_args
+        self.assertEqual(sns_args[0][0], topic_arn)
+    
     @patch('lambda_function.send_response')
     @patch('lambda_function.send_sns_notification')
     @patch('lambda_function.get_current_bpa_config')
@@ -255,8 +398,7 @@ class TestCreateHandler(unittest.TestCase):
 class TestLambdaHandler(unittest.TestCase):
     
     def setUp(self):
-        self.context = MagicMock()
-        self.context.aws_request_id = 'test-request-id'
+        self.context = LAMBDA_CONTEXT
     
     @patch('lambda_function.handle_create')
     def test_lambda_handler_create(self, mock_handle_create):
@@ -325,9 +467,12 @@ class TestLambdaHandler(unittest.TestCase):
     @patch('lambda_function.send_sns_notification')
     @patch('lambda_function.send_response')
     @patch('lambda_function.get_current_bpa_config')
-    def test_lambda_handler_access_denied(self, mock_get_current, mock_send_response, mock_send_sns):
+    @patch('lambda_function.get_account_id')
+    def test_lambda_handler_access_denied(self, mock_get_account_id, mock_get_current, mock_send_response, mock_send_sns):
         from botocore.exceptions import ClientError
         
+        mock_get_account_id.return_value = '123456789012'
+        
         error_response = {
             'Error': {
                 'Code': 'AccessDenied',
@@ -359,7 +504,3 @@ class TestLambdaHandler(unittest.TestCase):
         args = mock_send_response.call_args
         self.assertEqual(args[0][2], 'FAILED')
         self.assertIn('Insufficient permissions', args[0][3])
-
-
-if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file